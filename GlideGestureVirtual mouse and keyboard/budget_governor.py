@@ -0,0 +1,238 @@
+import argparse
+import statistics
+import time
+from contextlib import contextmanager
+
+# Quality ladder, best first. Lower levels trade tracking quality for CPU.
+QUALITY_LEVELS = [
+    {"model_complexity": 1, "scale": 1.0, "stride": 1},
+    {"model_complexity": 1, "scale": 0.75, "stride": 1},
+    {"model_complexity": 0, "scale": 0.75, "stride": 1},
+    {"model_complexity": 0, "scale": 0.5, "stride": 1},
+    {"model_complexity": 0, "scale": 0.5, "stride": 2},
+    {"model_complexity": 0, "scale": 0.5, "stride": 3},
+]
+
+# Skipping frames lowers CPU but not the latency of the frames that are processed,
+# so a latency target only walks the levels that keep every frame.
+LATENCY_LEVELS = [level for level in QUALITY_LEVELS if level["stride"] == 1]
+
+
+def describe_level(level):
+    rate = "every frame" if level["stride"] == 1 else f"every {level['stride']} frames"
+    return f"complexity {level['model_complexity']}, {int(level['scale'] * 100)}% resolution, {rate}"
+
+
+class BudgetGovernor:
+    """
+    Keeps a LandmarkEngine within a latency or CPU budget.
+
+    Every `window` processed frames the loop is measured against the target, either the p95
+    latency of engine.process() in milliseconds or the fraction of one core used by this process.
+    A window over the target steps one level down right away. Stepping back up needs
+    `upgrade_windows` consecutive windows below `headroom` x target. That requirement doubles when
+    an upgrade is undone within `revert_windows` windows, so the governor settles instead of
+    oscillating, and goes back to its base value after `stable_windows` windows without a change.
+    """
+
+    def __init__(self, engine, target_p95_ms=None, target_cpu=None, window=60, headroom=0.7,
+                 upgrade_windows=3, revert_windows=3, stable_windows=30, levels=None, start_level=0,
+                 clock=time.perf_counter, cpu_clock=time.process_time):
+        if (target_p95_ms is None) == (target_cpu is None):
+            raise ValueError("Set exactly one of target_p95_ms or target_cpu")
+        self.engine = engine
+        self.target_p95_ms = target_p95_ms
+        self.target_cpu = target_cpu
+        self.window = window
+        self.headroom = headroom
+        self.base_upgrade_windows = upgrade_windows
+        self.upgrade_windows = upgrade_windows
+        self.max_upgrade_windows = upgrade_windows * 8
+        self.revert_windows = revert_windows
+        self.stable_windows = stable_windows
+        if levels is None:
+            levels = LATENCY_LEVELS if target_p95_ms is not None else QUALITY_LEVELS
+        self.levels = levels
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+
+        self.level = start_level
+        self.engine.configure(**self.levels[self.level])
+        self.good_windows = 0
+        self.windows_since_change = 0
+        self.last_action = None
+        self.at_floor_logged = False
+        self.decisions = []
+        self._reset_window()
+
+    def _reset_window(self):
+        self.samples = []
+        self.window_wall_start = self.clock()
+        self.window_cpu_start = self.cpu_clock()
+
+    def restart_window(self):
+        """Discard the current window, e.g. when the loop resumes after idling so idle time is not measured."""
+        self._reset_window()
+
+    @contextmanager
+    def measure(self):
+        """Time one pass of the loop: `with governor.measure(): engine.process(frame)`."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.record(self.clock() - start)
+
+    def record(self, latency):
+        """Record the latency of one frame in seconds."""
+        self.samples.append(latency)
+        if len(self.samples) >= self.window:
+            self._evaluate()
+
+    def _current_value(self):
+        if self.target_p95_ms is not None:
+            p95 = statistics.quantiles(self.samples, n=20)[-1] if len(self.samples) > 1 else self.samples[0]
+            return "p95", p95 * 1000, self.target_p95_ms
+        wall = self.clock() - self.window_wall_start
+        cpu = self.cpu_clock() - self.window_cpu_start
+        return "cpu", cpu / wall if wall > 0 else 0.0, self.target_cpu
+
+    def _evaluate(self):
+        metric, value, target = self._current_value()
+        self.windows_since_change += 1
+
+        if value > target:
+            self.good_windows = 0
+            if self.level < len(self.levels) - 1:
+                if self.last_action == "up" and self.windows_since_change <= self.revert_windows:
+                    # The last upgrade did not fit the budget, be slower to try again
+                    self.upgrade_windows = min(self.upgrade_windows * 2, self.max_upgrade_windows)
+                    self._log("backoff", metric, value, target)
+                self._step(self.level + 1, "down", metric, value, target)
+            elif not self.at_floor_logged:
+                self._log("floor", metric, value, target)
+                self.at_floor_logged = True
+        elif value < target * self.headroom:
+            self.good_windows += 1
+            if self.level > 0 and self.good_windows >= self.upgrade_windows:
+                self.good_windows = 0
+                self._step(self.level - 1, "up", metric, value, target)
+        else:
+            self.good_windows = 0
+
+        if self.windows_since_change >= self.stable_windows and self.upgrade_windows != self.base_upgrade_windows:
+            self.upgrade_windows = self.base_upgrade_windows
+            self._log("reset", metric, value, target)
+
+        self._reset_window()
+
+    def _step(self, level, action, metric, value, target):
+        self.level = level
+        self.engine.configure(**self.levels[level])
+        self.last_action = action
+        self.windows_since_change = 0
+        self.at_floor_logged = False
+        self._log(action, metric, value, target)
+
+    def _log(self, action, metric, value, target):
+        level = self.levels[self.level]
+        self.decisions.append({"time": time.time(),
+                               "action": action,
+                               "metric": metric,
+                               "value": value,
+                               "target": target,
+                               "level": self.level,
+                               "settings": dict(level),
+                               "upgrade_windows": self.upgrade_windows})
+        if metric == "p95":
+            measured = f"p95 {value:.1f} ms (target {target:.1f} ms)"
+        else:
+            measured = f"CPU {value:.0%} of one core (target {target:.0%})"
+        if action == "down":
+            print(f"⬇️ Governor: {measured} → level {self.level}: {describe_level(level)}")
+        elif action == "up":
+            print(f"⬆️ Governor: {measured} → level {self.level}: {describe_level(level)}")
+        elif action == "backoff":
+            print(f"⏳ Governor: {measured}, upgrade undone after {self.windows_since_change} windows, "
+                  f"upgrades now need {self.upgrade_windows} good windows")
+        elif action == "reset":
+            print(f"↩️ Governor: {measured}, stable for {self.windows_since_change} windows, "
+                  f"upgrades need {self.upgrade_windows} good windows again")
+        else:
+            print(f"⚠️ Governor: {measured}, already at lowest quality: {describe_level(level)}")
+
+
+def make_slowed_engine(slowdown_ms, **engine_options):
+    """
+    LandmarkEngine that burns `slowdown_ms` of extra CPU per inference at full quality,
+    scaled down with resolution and model complexity, to emulate a weaker machine.
+    """
+    from gesture_utils import LandmarkEngine
+
+    class SlowedEngine(LandmarkEngine):
+        def _run_model(self, frame):
+            cost = slowdown_ms / 1000 * self.scale ** 2 * (1.0 if self.model_complexity else 0.5)
+            end = time.perf_counter() + cost
+            while time.perf_counter() < end:
+                pass  # Busy wait so the delay shows up as CPU time as well as latency
+            return super()._run_model(frame)
+
+    return SlowedEngine(**engine_options)
+
+
+def replay(video_path, governor_options, slowdown_ms=0.0, realtime=False, loops=1):
+    """Run the governor over a recorded video and return it for inspection."""
+    import cv2
+
+    engine = make_slowed_engine(slowdown_ms)
+    governor = BudgetGovernor(engine, **governor_options)
+    latencies = []
+
+    for _ in range(loops):
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            engine.close()
+            raise IOError(f"Could not open video {video_path}")
+        frame_interval = 1 / (cap.get(cv2.CAP_PROP_FPS) or 30)
+        while True:
+            frame_start = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                break
+            with governor.measure():
+                engine.process(frame)
+            latencies.append(time.perf_counter() - frame_start)
+            if realtime:
+                time.sleep(max(0.0, frame_interval - (time.perf_counter() - frame_start)))
+        cap.release()
+
+    engine.close()
+    if len(latencies) > 1:
+        p95 = statistics.quantiles(latencies, n=20)[-1] * 1000
+        print(f"📊 {len(latencies)} frames, overall p95 {p95:.1f} ms, "
+              f"{len(governor.decisions)} decisions, final level {governor.level}: "
+              f"{describe_level(governor.levels[governor.level])}")
+    return governor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded video through the budget governor")
+    parser.add_argument("video", help="Path to a recorded video")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--target-p95-ms", type=float, help="Keep p95 landmark latency under this many ms")
+    target.add_argument("--target-cpu", type=float, help="Keep CPU under this fraction of one core, e.g. 0.25")
+    parser.add_argument("--slowdown-ms", type=float, default=0.0, help="Extra CPU burned per full-quality inference")
+    parser.add_argument("--window", type=int, default=60, help="Frames per measurement window")
+    parser.add_argument("--realtime", action="store_true", help="Pace playback at the video's frame rate (needed for --target-cpu)")
+    parser.add_argument("--loops", type=int, default=1, help="Play the video this many times")
+    args = parser.parse_args()
+
+    replay(args.video,
+           {"target_p95_ms": args.target_p95_ms, "target_cpu": args.target_cpu, "window": args.window},
+           slowdown_ms=args.slowdown_ms,
+           realtime=args.realtime,
+           loops=args.loops)
+
+
+if __name__ == "__main__":
+    main()
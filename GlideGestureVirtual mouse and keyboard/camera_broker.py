@@ -0,0 +1,415 @@
+import argparse
+import collections
+import json
+import os
+import secrets
+import threading
+import time
+from multiprocessing import AuthenticationError, resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
+
+import cv2
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+import glide_config
+from budget_governor import BudgetGovernor
+from gesture_utils import LandmarkEngine
+
+# Local channel shared by the broker and its subscribers
+BROKER_HOST = "localhost"
+BROKER_PORT_ENV = "GLIDE_BROKER_PORT"  # Overrides DEFAULT_BROKER_PORT for the broker and its subscribers
+DEFAULT_BROKER_PORT = 6060
+BROKER_KEY_ENV = "GLIDE_BROKER_KEY"  # Per-session secret shared by the broker and its subscribers
+FRAME_SLOTS = 4  # Frames kept in shared memory for subscribers that also want images
+HANDSHAKE_TIMEOUT = 5  # Seconds a new subscriber has to send its hello
+
+
+def _attach_shared_memory(name):
+    """Attach to an existing shared memory block without letting this process unlink it on exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument, so drop the registration by hand
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class FrameRing:
+    """
+    Fixed-size ring of camera frames in shared memory.
+    Each slot carries the sequence number of the frame it holds, so a reader can tell
+    when the broker has overwritten a slot while it was being copied.
+    """
+
+    def __init__(self, shape, slots=FRAME_SLOTS, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        header_size = 8 * slots
+        if name is None:
+            size = header_size + slots * int(np.prod(self.shape))
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = _attach_shared_memory(name)
+            self.owner = False
+        self.name = self.shm.name
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=header_size)
+        if self.owner:
+            self.seqs[:] = -1
+
+    def write(self, seq, frame):
+        slot = seq % self.slots
+        self.seqs[slot] = -1  # Mark slot as being written
+        self.frames[slot] = frame
+        self.seqs[slot] = seq
+        return slot
+
+    def read(self, slot, seq):
+        """Return a copy of the frame, or None if the slot no longer holds frame `seq`."""
+        if self.seqs[slot] != seq:
+            return None
+        frame = self.frames[slot].copy()
+        if self.seqs[slot] != seq:
+            return None
+        return frame
+
+    def close(self):
+        # numpy views must be dropped before the buffer can be released
+        del self.seqs, self.frames
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def broker_address():
+    """Return the broker address, using GLIDE_BROKER_PORT when it is set."""
+    return BROKER_HOST, int(os.environ.get(BROKER_PORT_ENV, DEFAULT_BROKER_PORT))
+
+
+def broker_key():
+    """Return the session key from the environment as bytes, or None if it is not set."""
+    key = os.environ.get(BROKER_KEY_ENV)
+    return key.encode() if key else None
+
+
+def _encode(message):
+    return json.dumps(message, separators=(",", ":")).encode()
+
+
+def _decode(data):
+    return json.loads(data.decode())
+
+
+def _pack_hands(multi_hand_landmarks):
+    if not multi_hand_landmarks:
+        return None
+    return [[(lm.x, lm.y, lm.z) for lm in hand.landmark] for hand in multi_hand_landmarks]
+
+
+def _unpack_hands(hands, mirror=False):
+    """Rebuild NormalizedLandmarkList objects so subscribers can use them like MediaPipe results."""
+    if not hands:
+        return None
+    multi_hand_landmarks = []
+    for hand in hands:
+        landmarks = [landmark_pb2.NormalizedLandmark(x=1.0 - x if mirror else x, y=y, z=z) for x, y, z in hand]
+        multi_hand_landmarks.append(landmark_pb2.NormalizedLandmarkList(landmark=landmarks))
+    return multi_hand_landmarks
+
+
+class _Subscriber:
+    """
+    One connected consumer. Delivery is pull-based: the client asks for each message, and only
+    the newest `queue_size` results wait for it here, so at most one message is ever in flight.
+    When the consumer falls behind the oldest results are dropped, so a slow subscriber never
+    stalls the capture loop or the other subscribers and never reads stale landmarks.
+    """
+
+    def __init__(self, conn, frames, queue_size):
+        self.conn = conn
+        self.frames = frames
+        self.pending = collections.deque(maxlen=queue_size)
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+        threading.Thread(target=self._send_loop, daemon=True).start()
+
+    def offer(self, payload):
+        with self.cond:
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append(payload)
+            self.cond.notify()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+    def _send_loop(self):
+        while True:
+            try:
+                self.conn.recv_bytes()  # Wait until the client asks for the next message
+            except (OSError, EOFError):
+                break
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    break
+                payload = self.pending.popleft()
+            try:
+                self.conn.send_bytes(payload)
+            except (OSError, EOFError):
+                break
+        self.closed = True
+        self.conn.close()
+
+
+class CameraBroker:
+    """Owns the camera and the landmark engine, and fans each inference result out to all subscribers."""
+
+    def __init__(self, camera_index=0, api_preference=None, width=1280, height=720,
+                 address=None, authkey=None, idle_timeout=None, target_p95_ms=None, target_cpu=None,
+                 **engine_options):
+        if api_preference is None:
+            self.cap = cv2.VideoCapture(camera_index)
+        else:
+            self.cap = cv2.VideoCapture(camera_index, api_preference)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.camera_index = camera_index
+        self.engine = LandmarkEngine(**engine_options)
+        self.governor = None
+        if target_p95_ms is not None or target_cpu is not None:
+            self.governor = BudgetGovernor(self.engine, target_p95_ms=target_p95_ms, target_cpu=target_cpu)
+        self.address = address if address is not None else broker_address()
+        self.authkey = authkey if authkey is not None else broker_key()
+        self.idle_timeout = idle_timeout
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.ring = None
+        self.listener = None
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                break  # Listener closed
+            # Authenticate and handshake off this thread so a stalled client cannot block the others
+            threading.Thread(target=self._handshake, args=(conn,), daemon=True).start()
+
+    def _handshake(self, conn):
+        try:
+            deliver_challenge(conn, self.authkey)
+            answer_challenge(conn, self.authkey)
+            if not conn.poll(HANDSHAKE_TIMEOUT):
+                raise TimeoutError(f"no hello within {HANDSHAKE_TIMEOUT}s")
+            hello = _decode(conn.recv_bytes(1024))
+            if not isinstance(hello, dict):
+                raise ValueError("hello is not a JSON object")
+            frames = bool(hello.get("frames", False))
+            queue_size = max(1, int(hello.get("queue_size", 1)))
+            conn.send_bytes(_encode({"shm": self.ring.name,
+                                     "slots": self.ring.slots,
+                                     "shape": list(self.ring.shape),
+                                     "config": {"camera_index": self.camera_index,
+                                                "max_num_hands": self.engine.max_num_hands,
+                                                "min_detection_confidence": self.engine.min_detection_confidence,
+                                                "min_tracking_confidence": self.engine.min_tracking_confidence}}))
+        except AuthenticationError as e:
+            print(f"⚠️ Rejected subscriber: {e}")
+            conn.close()
+            return
+        except (OSError, EOFError, ValueError, TypeError) as e:
+            print(f"⚠️ Subscriber handshake failed: {e}")
+            conn.close()
+            return
+        with self.lock:
+            self.subscribers.append(_Subscriber(conn, frames, queue_size))
+        kind = "landmarks + frames" if frames else "landmarks only"
+        print(f"➕ Subscriber connected ({kind}), {len(self.subscribers)} total")
+
+    def _live_subscribers(self):
+        with self.lock:
+            live = [s for s in self.subscribers if not s.closed]
+            if len(live) != len(self.subscribers):
+                for s in self.subscribers:
+                    if s.closed and s.dropped:
+                        print(f"➖ Subscriber disconnected ({s.dropped} stale messages dropped)")
+                    elif s.closed:
+                        print("➖ Subscriber disconnected")
+                self.subscribers = live
+            return live
+
+    def run(self):
+        if not self.cap.isOpened():
+            print("❌ Failed to open webcam. Please check your camera connection.")
+            self.close()
+            return
+        ret, frame = self.cap.read()
+        if not ret:
+            print("❌ Failed to grab frame from webcam")
+            self.close()
+            return
+
+        seq = 0
+        try:
+            self.ring = FrameRing(frame.shape)
+            self.listener = Listener(self.address)  # Subscribers are authenticated in _handshake
+            threading.Thread(target=self._accept_loop, daemon=True).start()
+            print(f"📡 Camera broker ready on {self.address[0]}:{self.address[1]} ({frame.shape[1]}x{frame.shape[0]})")
+
+            last_subscribed = time.time()
+            idle = True
+            while True:
+                ret, frame = self.cap.read()
+                if not ret:
+                    print("❌ Failed to grab frame from webcam")
+                    break
+
+                subscribers = self._live_subscribers()
+                if not subscribers:
+                    if self.idle_timeout is not None and time.time() - last_subscribed > self.idle_timeout:
+                        print(f"💤 No subscribers for {self.idle_timeout:g}s, shutting down broker")
+                        break
+                    idle = True
+                    continue  # Keep the camera drained but skip inference while nobody listens
+                last_subscribed = time.time()
+                if idle and self.governor is not None:
+                    self.governor.restart_window()  # Idle and startup time would read as spare CPU
+                idle = False
+
+                if self.governor is None:
+                    multi_hand_landmarks = self.engine.process(frame)
+                else:
+                    with self.governor.measure():
+                        multi_hand_landmarks = self.engine.process(frame)
+                slot = None
+                if any(s.frames for s in subscribers):
+                    slot = self.ring.write(seq, frame)
+
+                # Serialize once; every subscriber gets the same bytes
+                payload = _encode({"seq": seq,
+                                   "time": time.time(),
+                                   "slot": slot,
+                                   "hands": _pack_hands(multi_hand_landmarks)})
+                for subscriber in subscribers:
+                    subscriber.offer(payload)
+                seq += 1
+
+        except KeyboardInterrupt:
+            print("🛑 Broker interrupted by user")
+
+        except OSError as e:
+            print(f"❌ Camera broker failed: {e}")
+
+        finally:
+            self.close()
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.close()
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber.close()
+            self.subscribers = []
+        self.cap.release()
+        self.engine.close()
+        if self.ring is not None:
+            self.ring.close()
+        print("🧹 Broker cleanup complete: Released camera and shared memory")
+
+
+class BrokerClient:
+    """
+    Subscriber side of the camera broker, with the same read()/release() interface as LocalHandSource.
+    With frames=False only landmarks are received and read() returns None for the frame.
+    """
+
+    def __init__(self, authkey, address=None, frames=True, mirror=False, queue_size=1):
+        self.conn = Client(address if address is not None else broker_address(), authkey=authkey)
+        try:
+            self.conn.send_bytes(_encode({"frames": frames, "queue_size": queue_size}))
+            info = _decode(self.conn.recv_bytes())
+            self.frames = frames
+            self.mirror = mirror
+            self.config = info["config"]  # Camera and model settings the broker runs with
+            self.ring = FrameRing(info["shape"], slots=info["slots"], name=info["shm"]) if frames else None
+        except BaseException:
+            self.conn.close()
+            raise
+
+    def is_opened(self):
+        return not self.conn.closed
+
+    def read(self):
+        """Return (ok, frame, multi_hand_landmarks) for the next broker message."""
+        while True:
+            try:
+                self.conn.send_bytes(b"next")
+                message = _decode(self.conn.recv_bytes())
+            except (OSError, EOFError):
+                return False, None, None
+
+            frame = None
+            if self.frames:
+                frame = self.ring.read(message["slot"], message["seq"])
+                if frame is None:
+                    continue  # Slot was overwritten before we got to it, wait for a newer frame
+                if self.mirror:
+                    frame = cv2.flip(frame, 1)
+
+            return True, frame, _unpack_hands(message["hands"], mirror=self.mirror)
+
+    def release(self):
+        self.conn.close()
+        if self.ring is not None:
+            self.ring.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared camera and hand-landmark broker")
+    parser.add_argument("--camera", type=int, default=glide_config.CAMERA_INDEX, help="Camera index")
+    parser.add_argument("--dshow", action="store_true", help="Open the camera with DirectShow (Windows)")
+    parser.add_argument("--width", type=int, default=glide_config.CAPTURE_WIDTH)
+    parser.add_argument("--height", type=int, default=glide_config.CAPTURE_HEIGHT)
+    parser.add_argument("--port", type=int, help=f"Port to listen on (default: {BROKER_PORT_ENV} or {DEFAULT_BROKER_PORT})")
+    parser.add_argument("--idle-timeout", type=float, help="Exit after this many seconds without subscribers")
+    parser.add_argument("--max-hands", type=int, default=glide_config.MAX_NUM_HANDS)
+    parser.add_argument("--detection-confidence", type=float, default=glide_config.MIN_DETECTION_CONFIDENCE)
+    parser.add_argument("--tracking-confidence", type=float, default=glide_config.MIN_TRACKING_CONFIDENCE)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--target-p95-ms", type=float, help="Tune model quality to keep p95 landmark latency under this many ms")
+    target.add_argument("--target-cpu", type=float, help="Tune model quality to keep CPU under this fraction of one core, e.g. 0.25")
+    args = parser.parse_args()
+
+    authkey = broker_key()
+    if authkey is None:
+        key = secrets.token_hex(16)
+        authkey = key.encode()
+        print(f"🔑 {BROKER_KEY_ENV} not set, generated a key for this session. "
+              f"Set {BROKER_KEY_ENV}={key} for gesture.py and main.py to connect.")
+
+    broker = CameraBroker(camera_index=args.camera,
+                          api_preference=cv2.CAP_DSHOW if args.dshow else None,
+                          width=args.width,
+                          height=args.height,
+                          address=(BROKER_HOST, args.port) if args.port else None,
+                          authkey=authkey,
+                          idle_timeout=args.idle_timeout,
+                          target_p95_ms=args.target_p95_ms,
+                          target_cpu=args.target_cpu,
+                          max_num_hands=args.max_hands,
+                          min_detection_confidence=args.detection_confidence,
+                          min_tracking_confidence=args.tracking_confidence)
+    broker.run()
+
+
+if __name__ == "__main__":
+    main()
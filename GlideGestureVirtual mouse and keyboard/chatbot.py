@@ -6,6 +6,8 @@ import sys
 import time
 import threading
 import queue
+import secrets
+import glide_config
 
 # Thread-safe queue for messages
 message_queue = queue.Queue()
@@ -14,6 +16,9 @@ message_queue = queue.Queue()
 NEXIS_DIR = "C:/Users/Ujesh/Desktop/NEXIS"
 GESTURE_PY_PATH = os.path.join(NEXIS_DIR, "gesture.py")
 MAIN_PY_PATH = os.path.join(NEXIS_DIR, "main.py")
+BROKER_PY_PATH = os.path.join(NEXIS_DIR, "camera_broker.py")
+BROKER_WAIT_SECONDS = "10"  # How long gesture.py/main.py wait for the broker before opening the camera themselves
+BROKER_IDLE_TIMEOUT = "30"  # Broker exits by itself after this many seconds without subscribers
 
 # Initialize Streamlit session state
 def initialize_session_state():
@@ -27,6 +32,11 @@ def initialize_session_state():
         st.session_state.gesture_running = False
     if "main_running" not in st.session_state:
         st.session_state.main_running = False
+    if "broker_process" not in st.session_state:
+        st.session_state.broker_process = None
+    if "broker_key" not in st.session_state:
+        # Random per-session secret so only programs started here can talk to the broker
+        st.session_state.broker_key = secrets.token_hex(16)
     if "last_command" not in st.session_state:
         st.session_state.last_command = None
     if "command_input" not in st.session_state:
@@ -67,6 +77,62 @@ def read_process_output(process, output_type):
     process.stdout.close()
     process.stderr.close()
 
+def start_broker():
+    """Start the shared camera broker so gesture.py and main.py can run together on one camera."""
+    if is_process_alive(st.session_state.broker_process):
+        return
+    try:
+        broker_process = subprocess.Popen(
+            [sys.executable, BROKER_PY_PATH,
+             "--camera", str(glide_config.CAMERA_INDEX),
+             "--width", str(glide_config.CAPTURE_WIDTH),
+             "--height", str(glide_config.CAPTURE_HEIGHT),
+             "--max-hands", str(glide_config.MAX_NUM_HANDS),
+             "--detection-confidence", str(glide_config.MIN_DETECTION_CONFIDENCE),
+             "--tracking-confidence", str(glide_config.MIN_TRACKING_CONFIDENCE),
+             "--idle-timeout", BROKER_IDLE_TIMEOUT],
+            cwd=NEXIS_DIR,
+            env=broker_env(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=False,  # Use bytes for compatibility
+            shell=False,
+            creationflags=subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP if os.name == 'nt' else 0
+        )
+        st.session_state.broker_process = broker_process
+        print(f"Started camera_broker.py with PID: {broker_process.pid}")
+        threading.Thread(target=read_process_output, args=(broker_process, "Broker"), daemon=True).start()
+    except Exception as e:
+        # Programs fall back to opening the camera themselves
+        print(f"Error starting camera broker: {e}")
+
+def stop_broker():
+    """Stop the camera broker once neither program needs it."""
+    if is_process_alive(st.session_state.gesture_process) or is_process_alive(st.session_state.main_process):
+        return
+    if not is_process_alive(st.session_state.broker_process):
+        st.session_state.broker_process = None
+        return
+    try:
+        st.session_state.broker_process.terminate()
+        st.session_state.broker_process.wait(timeout=5)
+        print("Camera broker stopped.")
+    except Exception as e:
+        print(f"Error stopping camera broker: {e}")
+    st.session_state.broker_process = None
+
+def child_env():
+    """Environment for gesture.py/main.py: wait for the broker instead of racing it for the camera."""
+    env = broker_env()
+    env["GLIDE_BROKER_WAIT"] = BROKER_WAIT_SECONDS
+    return env
+
+def broker_env():
+    """Environment carrying this session's broker key."""
+    env = os.environ.copy()
+    env["GLIDE_BROKER_KEY"] = st.session_state.broker_key
+    return env
+
 def start_gesture_bot():
     print(f"Attempting to start gesture.py at {GESTURE_PY_PATH}")
     print(f"Current gesture_process: {st.session_state.gesture_process}, gesture_running: {st.session_state.gesture_running}")
@@ -77,11 +143,13 @@ def start_gesture_bot():
     if st.session_state.gesture_process is not None and not is_process_alive(st.session_state.gesture_process):
         st.session_state.gesture_process = None
         st.session_state.gesture_running = False
+    start_broker()
     try:
         python_executable = sys.executable
         gesture_process = subprocess.Popen(
             [python_executable, GESTURE_PY_PATH],
             cwd=NEXIS_DIR,
+            env=child_env(),
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=False,  # Use bytes for compatibility
@@ -99,12 +167,15 @@ def start_gesture_bot():
             return "Mouse and keyboard control started."
         else:
             print("Gesture process failed to start.")
+            stop_broker()
             return "Error: Failed to start mouse and keyboard control."
     except FileNotFoundError:
+        stop_broker()
         error_msg = f"Error: gesture.py not found at {GESTURE_PY_PATH}"
         print(error_msg)
         return error_msg
     except Exception as e:
+        stop_broker()
         error_msg = f"Error starting mouse and keyboard control: {e}"
         print(error_msg)
         return error_msg
@@ -115,6 +186,7 @@ def stop_gesture_bot():
     if not st.session_state.gesture_running or not is_process_alive(st.session_state.gesture_process):
         st.session_state.gesture_process = None
         st.session_state.gesture_running = False
+        stop_broker()
         print("No gesture process running.")
         return "Mouse and keyboard control is not running."
     try:
@@ -125,6 +197,7 @@ def stop_gesture_bot():
         st.session_state.gesture_process.wait(timeout=5)
         st.session_state.gesture_process = None
         st.session_state.gesture_running = False
+        stop_broker()
         print("Gesture process stopped.")
         return "Mouse and keyboard control stopped."
     except Exception as e:
@@ -142,11 +215,13 @@ def start_main():
     if st.session_state.main_process is not None and not is_process_alive(st.session_state.main_process):
         st.session_state.main_process = None
         st.session_state.main_running = False
+    start_broker()
     try:
         python_executable = sys.executable
         main_process = subprocess.Popen(
             [python_executable, MAIN_PY_PATH],
             cwd=NEXIS_DIR,
+            env=child_env(),
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=False,  # Use bytes for compatibility
@@ -164,12 +239,15 @@ def start_main():
             return "Main program started."
         else:
             print("Main process failed to start.")
+            stop_broker()
             return "Error: Failed to start main program."
     except FileNotFoundError:
+        stop_broker()
         error_msg = f"Error: main.py not found at {MAIN_PY_PATH}"
         print(error_msg)
         return error_msg
     except Exception as e:
+        stop_broker()
         error_msg = f"Error starting main program: {e}"
         print(error_msg)
         return error_msg
@@ -180,6 +258,7 @@ def stop_main():
     if not st.session_state.main_running or not is_process_alive(st.session_state.main_process):
         st.session_state.main_process = None
         st.session_state.main_running = False
+        stop_broker()
         print("No main process running.")
         return "Main program is not running."
     try:
@@ -190,6 +269,7 @@ def stop_main():
         st.session_state.main_process.wait(timeout=5)
         st.session_state.main_process = None
         st.session_state.main_running = False
+        stop_broker()
         print("Main process stopped.")
         return "Main program stopped."
     except Exception as e:
@@ -231,6 +311,7 @@ def process_command(command):
     elif "exit" in command or "quit" in command:
         status_gesture = stop_gesture_bot()
         status_main = stop_main()
+        stop_broker()
         display_message("Bot", status_gesture)
         display_message("Bot", status_main)
         display_message("Bot", "Goodbye!")
@@ -280,6 +361,10 @@ with chat_container:
             st.markdown(f"**Main.py Output**: {message}")
         elif speaker == "Main.py Error":
             st.markdown(f"**Main.py Error**: {message}")
+        elif speaker == "Broker Output":
+            st.markdown(f"**Broker Output**: {message}")
+        elif speaker == "Broker Error":
+            st.markdown(f"**Broker Error**: {message}")
 
 # Stop processes if they are not alive
 if st.session_state.gesture_process is not None and not is_process_alive(st.session_state.gesture_process):
@@ -4,22 +4,21 @@ import pyautogui
 import numpy as np
 import time
 import ctypes  # For always-on-top (Windows-specific)
+from gesture_utils import open_hand_source
+from glide_config import CAPTURE_WIDTH, CAPTURE_HEIGHT
 
 # PyAutoGUI settings
 pyautogui.FAILSAFE = False
 pyautogui.PAUSE = 0.01
 screen_width, screen_height = pyautogui.size()
 
-# Initialize MediaPipe Hands
+# MediaPipe drawing helpers
 mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(max_num_hands=1, min_detection_confidence=0.7)
 mp_drawing = mp.solutions.drawing_utils
 
-# Initialize webcam
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-frame_width, frame_height = 1280, 720
+# Initialize hand tracking (shared camera broker if running, otherwise own webcam)
+source = open_hand_source(mirror=True)
+frame_width, frame_height = CAPTURE_WIDTH, CAPTURE_HEIGHT
 
 # State variables
 prev_x, prev_y = 0, 0
@@ -128,14 +127,10 @@ hwnd = ctypes.windll.user32.FindWindowW(None, 'Gesture Control')
 ctypes.windll.user32.SetWindowPos(hwnd, -1, 0, 0, 0, 0, 0x0001 | 0x0002)
 
 while True:
-    ret, frame = cap.read()
+    ret, frame, multi_hand_landmarks = source.read()
     if not ret:
         break
 
-    frame = cv2.flip(frame, 1)
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = hands.process(frame_rgb)
-
     # Draw keyboard if active
     if show_keyboard:
         # Draw with red highlight if a key is blinking
@@ -145,8 +140,8 @@ while True:
             frame = draw_virtual_keyboard(frame)
             blink_key = None  # Reset blink after duration
 
-    if results.multi_hand_landmarks:
-        for hand_landmarks in results.multi_hand_landmarks:
+    if multi_hand_landmarks:
+        for hand_landmarks in multi_hand_landmarks:
             mp_drawing.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
 
             index_tip = hand_landmarks.landmark[8]
@@ -223,5 +218,5 @@ while True:
     if cv2.waitKey(1) & 0xFF == ord('q'):
         break
 
-cap.release()
+source.release()
 cv2.destroyAllWindows()
\ No newline at end of file
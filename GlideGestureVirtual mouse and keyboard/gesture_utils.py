@@ -1,24 +1,192 @@
-import mediapipe as mp
-import cv2
+import os
+import time
+from multiprocessing import AuthenticationError
 
 import cv2
 import mediapipe as mp
 
+import glide_config
+from budget_governor import BudgetGovernor
+
+
+class LandmarkEngine:
+    """
+    Runs the MediaPipe hand-landmark model on BGR frames.
+    model_complexity, scale (inference resolution) and stride (run the model on every Nth frame)
+    trade tracking quality for CPU and can be changed at runtime with configure().
+    """
+
+    def __init__(self, max_num_hands=1, min_detection_confidence=0.7, min_tracking_confidence=0.5,
+                 model_complexity=1, scale=1.0, stride=1):
+        self.max_num_hands = max_num_hands
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self.model_complexity = model_complexity
+        self.scale = scale
+        self.stride = stride
+        self.frame_count = 0
+        self.last_result = None
+        self.hands = self._create_hands()
+
+    def _create_hands(self):
+        return mp.solutions.hands.Hands(static_image_mode=False,
+                                        max_num_hands=self.max_num_hands,
+                                        model_complexity=self.model_complexity,
+                                        min_detection_confidence=self.min_detection_confidence,
+                                        min_tracking_confidence=self.min_tracking_confidence)
+
+    def configure(self, model_complexity=None, scale=None, stride=None):
+        """Change quality settings; the model is only rebuilt when its complexity changes."""
+        if model_complexity is not None and model_complexity != self.model_complexity:
+            self.hands.close()
+            self.model_complexity = model_complexity
+            self.hands = self._create_hands()
+        if scale is not None:
+            self.scale = scale
+        if stride is not None:
+            self.stride = stride
+
+    def process(self, frame):
+        """Return the detected hands as a list of NormalizedLandmarkList, or None."""
+        self.frame_count += 1
+        if self.stride > 1 and self.frame_count % self.stride:
+            return self.last_result  # Skipped frame, reuse the last result
+        self.last_result = self._run_model(frame)
+        return self.last_result
+
+    def _run_model(self, frame):
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = self.hands.process(frame_rgb)
+        return results.multi_hand_landmarks
+
+    def close(self):
+        self.hands.close()
+
+
+class LocalHandSource:
+    """Owns a webcam and a landmark engine in this process (used when no camera broker is running)."""
+
+    def __init__(self, camera_index=0, api_preference=None, width=None, height=None, mirror=False,
+                 target_p95_ms=None, target_cpu=None, **engine_options):
+        if api_preference is None:
+            self.cap = cv2.VideoCapture(camera_index)
+        else:
+            self.cap = cv2.VideoCapture(camera_index, api_preference)
+        if width and height:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.mirror = mirror
+        self.engine = LandmarkEngine(**engine_options)
+        self.governor = None
+        if target_p95_ms is not None or target_cpu is not None:
+            self.governor = BudgetGovernor(self.engine, target_p95_ms=target_p95_ms, target_cpu=target_cpu)
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        """Return (ok, frame, multi_hand_landmarks) for the next camera frame."""
+        ret, frame = self.cap.read()
+        if not ret:
+            return False, None, None
+        if self.mirror:
+            frame = cv2.flip(frame, 1)
+        if self.governor is None:
+            return True, frame, self.engine.process(frame)
+        with self.governor.measure():
+            multi_hand_landmarks = self.engine.process(frame)
+        return True, frame, multi_hand_landmarks
+
+    def release(self):
+        self.cap.release()
+        self.engine.close()
+
+
+def _governor_targets_from_env():
+    """Read GLIDE_TARGET_P95_MS / GLIDE_TARGET_CPU, reporting unusable values instead of failing later."""
+    targets = {}
+    for env_name, option in (("GLIDE_TARGET_P95_MS", "target_p95_ms"), ("GLIDE_TARGET_CPU", "target_cpu")):
+        value = os.environ.get(env_name)
+        if not value:
+            continue
+        try:
+            number = float(value)
+        except ValueError:
+            print(f"❌ {env_name} must be a number, got '{value}'. Ignoring it.")
+            continue
+        if number <= 0:
+            print(f"❌ {env_name} must be greater than 0, got {value}. Ignoring it.")
+            continue
+        targets[option] = number
+    if len(targets) == 2:
+        print("⚠️ Both GLIDE_TARGET_P95_MS and GLIDE_TARGET_CPU are set, using GLIDE_TARGET_P95_MS")
+        del targets["target_cpu"]
+    return targets
+
+
+def open_hand_source(mirror=False, frames=True, **local_options):
+    """
+    Connects to the shared camera broker if one is running, otherwise opens the webcam locally.
+    Camera and model settings default to glide_config, the same values the chatbot starts the broker with.
+    A broker serving a different camera is not used; differing model settings only print a warning.
+    The broker is only tried when GLIDE_BROKER_KEY holds the session key it was started with.
+    GLIDE_BROKER_PORT selects the broker port, matching the broker's own setting.
+    Set GLIDE_BROKER_WAIT to the number of seconds to keep retrying the broker before falling back.
+    Set GLIDE_TARGET_P95_MS or GLIDE_TARGET_CPU to run the local engine under a budget governor.
+    """
+    from camera_broker import BrokerClient, broker_key
+
+    if "target_p95_ms" not in local_options and "target_cpu" not in local_options:
+        local_options.update(_governor_targets_from_env())
+    local_options.setdefault("camera_index", glide_config.CAMERA_INDEX)
+    local_options.setdefault("width", glide_config.CAPTURE_WIDTH)
+    local_options.setdefault("height", glide_config.CAPTURE_HEIGHT)
+    local_options.setdefault("max_num_hands", glide_config.MAX_NUM_HANDS)
+    local_options.setdefault("min_detection_confidence", glide_config.MIN_DETECTION_CONFIDENCE)
+    local_options.setdefault("min_tracking_confidence", glide_config.MIN_TRACKING_CONFIDENCE)
+
+    authkey = broker_key()
+    deadline = time.time() + float(os.environ.get("GLIDE_BROKER_WAIT", 0))
+    source = None
+    while source is None and authkey is not None:
+        try:
+            source = BrokerClient(authkey, frames=frames, mirror=mirror)
+        except (OSError, EOFError, ValueError, AuthenticationError):
+            # Nothing listening, or something other than the broker on its port
+            if time.time() >= deadline:
+                break
+            time.sleep(0.2)
+
+    if source is not None:
+        camera_index = local_options["camera_index"]
+        if source.config["camera_index"] != camera_index:
+            print(f"📷 Camera broker serves camera {source.config['camera_index']}, not camera {camera_index}, "
+                  f"opening webcam directly")
+            source.release()
+        else:
+            for option in ("max_num_hands", "min_detection_confidence", "min_tracking_confidence"):
+                if option in local_options and local_options[option] != source.config[option]:
+                    print(f"⚠️ Camera broker runs with {option}={source.config[option]}, "
+                          f"this program asked for {local_options[option]}")
+            print("📡 Connected to shared camera broker")
+            return source
+    else:
+        print("📷 No camera broker running, opening webcam directly")
+
+    return LocalHandSource(mirror=mirror, **local_options)
+
+
 class HandGesture:
     def __init__(self):
-        self.hands = mp.solutions.hands.Hands(static_image_mode=False,
-                                              max_num_hands=1,
-                                              min_detection_confidence=0.7,
-                                              min_tracking_confidence=0.7)
         self.mp_draw = mp.solutions.drawing_utils
 
-    def detect_gesture(self, frame):
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(frame_rgb)
+    def detect_gesture(self, frame, multi_hand_landmarks):
         gesture = None
 
-        if results.multi_hand_landmarks:
-            hand_landmarks = results.multi_hand_landmarks[0]
+        if multi_hand_landmarks:
+            hand_landmarks = multi_hand_landmarks[0]
 
             # Tip and MCP of index and middle finger
             tips_ids = [8, 12]
@@ -38,4 +206,3 @@ class HandGesture:
             self.mp_draw.draw_landmarks(frame, hand_landmarks, mp.solutions.hands.HAND_CONNECTIONS)
 
         return gesture, frame
-
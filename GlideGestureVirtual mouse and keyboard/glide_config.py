@@ -0,0 +1,11 @@
+# Settings shared by camera_broker.py, gesture.py, main.py and chatbot.py.
+# The broker serves a single camera, so both programs must ask for the same one to share it.
+
+# Camera
+CAMERA_INDEX = 0
+CAPTURE_WIDTH, CAPTURE_HEIGHT = 1280, 720
+
+# Hand-landmark model
+MAX_NUM_HANDS = 1
+MIN_DETECTION_CONFIDENCE = 0.7
+MIN_TRACKING_CONFIDENCE = 0.7
@@ -3,7 +3,7 @@ import time
 import win32gui
 import win32con
 from pynput.keyboard import Controller, Key
-from gesture_utils import HandGesture
+from gesture_utils import HandGesture, open_hand_source
 
 # Initialize keyboard controller
 keyboard = Controller()
@@ -59,9 +59,9 @@ if not focus_window("Hill Climb"):
     print("🛑 Could not find or focus the game window. Please ensure the game is open and try again.")
     exit(1)
 
-# Initialize webcam and gesture detector
-cap = cv2.VideoCapture(1, cv2.CAP_DSHOW)
-if not cap.isOpened():
+# Initialize hand tracking (shared camera broker if running, otherwise own webcam) and gesture detector
+source = open_hand_source()
+if not source.is_opened():
     print("❌ Failed to open webcam. Please check your camera connection.")
     exit(1)
 
@@ -70,13 +70,13 @@ current_action = None
 
 try:
     while True:
-        ret, frame = cap.read()
+        ret, frame, multi_hand_landmarks = source.read()
         if not ret:
             print("❌ Failed to grab frame from webcam")
             break
 
         # Detect gesture and display output
-        gesture, output_frame = gesture_detector.detect_gesture(frame)
+        gesture, output_frame = gesture_detector.detect_gesture(frame, multi_hand_landmarks)
         cv2.imshow("Gesture Controller", output_frame)
 
         # Handle gestures
@@ -118,6 +118,6 @@ finally:
     # Cleanup
     keyboard.release(Key.right)
     keyboard.release(Key.left)
-    cap.release()
+    source.release()
     cv2.destroyAllWindows()
     print("🧹 Cleanup complete: Released keys and closed windows")
\ No newline at end of file
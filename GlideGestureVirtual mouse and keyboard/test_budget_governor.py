@@ -0,0 +1,100 @@
+from budget_governor import LATENCY_LEVELS, QUALITY_LEVELS, BudgetGovernor
+
+
+class FakeEngine:
+    def __init__(self):
+        self.settings = None
+
+    def configure(self, **settings):
+        self.settings = settings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_governor(**options):
+    engine = FakeEngine()
+    options.setdefault("target_p95_ms", 40)
+    options.setdefault("window", 1)
+    governor = BudgetGovernor(engine, clock=FakeClock(), cpu_clock=FakeClock(), **options)
+    return governor, engine
+
+
+def feed(governor, *latencies_ms):
+    for latency in latencies_ms:
+        governor.record(latency / 1000)
+
+
+def actions(governor):
+    return [decision["action"] for decision in governor.decisions]
+
+
+def test_steps_down_when_over_target():
+    governor, engine = make_governor(window=3)
+    feed(governor, 50, 50, 50)
+    assert governor.level == 1
+    assert engine.settings == LATENCY_LEVELS[1]
+    assert actions(governor) == ["down"]
+
+
+def test_steps_up_after_upgrade_windows():
+    governor, engine = make_governor(start_level=2, upgrade_windows=3)
+    feed(governor, 10, 10)
+    assert governor.level == 2
+    feed(governor, 10)
+    assert governor.level == 1
+    assert engine.settings == LATENCY_LEVELS[1]
+    assert actions(governor) == ["up"]
+
+
+def test_window_between_headroom_and_target_holds():
+    governor, _ = make_governor(start_level=1, upgrade_windows=2)
+    feed(governor, 10, 35, 10)  # 35 ms is under target but above 0.7 x target
+    assert governor.level == 1
+    assert governor.decisions == []
+
+
+def test_quick_revert_backs_off_then_resets_after_stable_run():
+    governor, _ = make_governor(start_level=1, upgrade_windows=2, revert_windows=2, stable_windows=5)
+    feed(governor, 10, 10, 50)
+    assert actions(governor) == ["up", "backoff", "down"]
+    assert governor.upgrade_windows == 4
+
+    feed(governor, 35, 35, 35, 35, 35)
+    assert actions(governor)[-1] == "reset"
+    assert governor.upgrade_windows == 2
+    assert governor.level == 1
+
+
+def test_late_downgrade_does_not_back_off():
+    governor, _ = make_governor(start_level=1, upgrade_windows=2, revert_windows=2)
+    feed(governor, 10, 10, 35, 35, 50)
+    assert actions(governor) == ["up", "down"]
+    assert governor.upgrade_windows == 2
+
+
+def test_floor_is_logged_once():
+    governor, _ = make_governor(start_level=len(LATENCY_LEVELS) - 1)
+    feed(governor, 50, 50, 50)
+    assert actions(governor) == ["floor"]
+
+
+def test_restart_window_discards_idle_time():
+    governor, engine = make_governor(target_p95_ms=None, target_cpu=0.5, window=2)
+    wall, cpu = governor.clock, governor.cpu_clock
+
+    wall.now += 10.0  # Idle: wall time passes, no CPU is used
+    governor.restart_window()
+    for _ in range(2):
+        wall.now += 0.1
+        cpu.now += 0.09
+        governor.record(0.09)
+
+    assert governor.level == 1
+    assert engine.settings == QUALITY_LEVELS[1]
+    assert abs(governor.decisions[0]["value"] - 0.9) < 1e-6